@@ -20,7 +20,8 @@ def generate_rfid_uid():
 print(f"Generating {NUM_PEOPLE} mock users (Students & Employees)...")
 
 data = []
-for _ in range(NUM_PEOPLE):
+used_ids, used_uids = set(), set()
+while len(data) < NUM_PEOPLE:
     # 90% Student, 10% Employee
     is_student = random.random() < 0.9
     
@@ -35,8 +36,15 @@ for _ in range(NUM_PEOPLE):
         id_number = f"E-{random.randint(1000, 9999)}"
         role = "Employee"
 
+    # Registry imports reject duplicate IDs and cards - re-roll collisions
+    rfid_uid = generate_rfid_uid()
+    if id_number in used_ids or rfid_uid in used_uids:
+        continue
+    used_ids.add(id_number)
+    used_uids.add(rfid_uid)
+
     row = {
-        "RFID_UID": generate_rfid_uid(), 
+        "RFID_UID": rfid_uid, 
         "ID_Number": id_number,
         "Last_Name": fake.last_name(),
         "First_Name": fake.first_name(),
@@ -0,0 +1,99 @@
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# ==========================================
+# CONFIGURATION & CONSTANTS
+# ==========================================
+
+load_dotenv()
+
+def read_setting(name, default, cast, minimum):
+    """Reads a numeric .env setting, falling back to `default` if it is missing or invalid."""
+    raw = os.getenv(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = cast(raw)
+    except ValueError:
+        value = None
+    if value is None or not math.isfinite(value) or value < minimum:
+        print(f"⚠️ Ignoring {name}={raw!r} (expected a number >= {minimum}), using {default}.")
+        return default
+    return value
+
+# Cheap readers report the same card 2-3 times in under a second.
+# Any repeat of a UID within this window is answered from the cache.
+DEBOUNCE_SECONDS = read_setting('TAP_DEBOUNCE_SECONDS', 2.0, float, 0)
+DEBOUNCE_MAX_ENTRIES = read_setting('TAP_DEBOUNCE_MAX_ENTRIES', 1024, int, 1)
+
+class TapDebouncer:
+    """
+    Bounded in-memory TTL cache of recent tap results, keyed by RFID UID.
+    The window starts at the original tap, so a card held on the reader
+    still registers again once the window has passed.
+    """
+
+    def __init__(self, window_seconds=DEBOUNCE_SECONDS, max_entries=DEBOUNCE_MAX_ENTRIES, clock=time.monotonic):
+        if window_seconds < 0 or max_entries < 1:
+            raise ValueError("window_seconds must be >= 0 and max_entries >= 1")
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._lock = threading.Lock() # Guards the cache and counters only
+        self._entries = OrderedDict()   # uid -> (expires_at, result)
+        self._counters = {'processed': 0, 'suppressed': 0, 'evicted': 0}
+
+    @property
+    def enabled(self):
+        return self.window_seconds > 0
+
+    def _purge_expired(self, now):
+        # Entries are kept in insertion order with a fixed window, so the oldest expire first
+        while self._entries:
+            uid, (expires_at, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[uid]
+
+    def get(self, uid):
+        """Returns the cached result for a duplicate read, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._purge_expired(self.clock())
+            entry = self._entries.get(uid)
+            if entry is None:
+                return None
+            self._counters['suppressed'] += 1
+            return entry[1]
+
+    def put(self, uid, result):
+        """Remembers the result of a processed tap for the debounce window."""
+        with self._lock:
+            self._counters['processed'] += 1
+            if not self.enabled:
+                return
+            now = self.clock()
+            self._purge_expired(now)
+            self._entries.pop(uid, None)
+            self._entries[uid] = (now + self.window_seconds, result)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters['evicted'] += 1
+
+    def stats(self):
+        # Counts only - card UIDs are never exposed
+        with self._lock:
+            return {
+                'window_seconds': self.window_seconds,
+                'max_entries': self.max_entries,
+                'cached': len(self._entries),
+                **self._counters
+            }
+
+# Shared instance used by the rfid_tap route
+tap_debouncer = TapDebouncer()
@@ -0,0 +1,406 @@
+import io
+import os
+import sys
+import threading
+import pandas as pd
+from datetime import datetime
+from utils import RECORD_DIR
+
+# ==========================================
+# CONFIGURATION & CONSTANTS
+# ==========================================
+# Master_List.xlsx stays the file every consumer reads, but changes to it go
+# through import_master(), which diffs the new file against the current snapshot
+# and appends only the changed people to a versioned history:
+#   Record/Registry/current.csv   -> latest version of every person
+#   Record/Registry/history.csv   -> append-only, one row per person per change
+#   Record/Registry/versions.csv  -> one row per import (counts & source file)
+# history.csv is the source of truth: it is written first, and version numbers
+# come from it. current.csv is replaced atomically afterwards, and versions.csv
+# is only a log. An import that crashes in between is simply recorded again as
+# the next version when it is re-run.
+# The tap-side UID index follows history.csv by reading only the rows appended
+# since it last looked, so an import run from another process reaches the
+# server without a full reload.
+
+MASTER_FILE = "Master_List.xlsx"
+REGISTRY_DIR = os.path.join(RECORD_DIR, 'Registry')
+CURRENT_FILE = os.path.join(REGISTRY_DIR, 'current.csv')
+HISTORY_FILE = os.path.join(REGISTRY_DIR, 'history.csv')
+VERSIONS_FILE = os.path.join(REGISTRY_DIR, 'versions.csv')
+
+MASTER_COLUMNS = ['RFID_UID', 'ID_Number', 'Last_Name', 'First_Name', 'Department', 'Role']
+DETAIL_COLUMNS = ['RFID_UID', 'Last_Name', 'First_Name', 'Department', 'Role']
+HISTORY_COLUMNS = MASTER_COLUMNS + ['Version', 'Valid_From', 'Change']
+VERSION_COLUMNS = ['Version', 'Imported_At', 'Source', 'Inserted', 'Updated', 'Reissued', 'Unchanged', 'Missing']
+
+_registry_lock = threading.Lock()
+_uid_index = {
+    'source': None,         # 'registry' (history.csv) or 'master' (no import yet)
+    'uids': {},             # RFID_UID -> person dict (tap-side lookup)
+    'by_id': {},            # ID_Number -> RFID_UID currently held
+    'history_offset': 0,    # Bytes of history.csv already applied
+    'master_mtime': None    # Master_List.xlsx mtime the 'master' index was built from
+}
+_history_cache = {'mtime': None, 'df': pd.DataFrame(columns=HISTORY_COLUMNS)}
+
+# ==========================================
+# FILE HELPERS
+# ==========================================
+
+def read_people_file(path):
+    """Loads a master file (.xlsx or .csv) with every column as clean text."""
+    df = _read_people(path)
+    # Never drop a row silently - the file has to be fixed first
+    problems, _ = _check_people(df)
+    if problems:
+        raise ValueError(f"{path} was not imported: " + "; ".join(problems))
+    return df
+
+def _read_people(path):
+    if path.lower().endswith('.csv'):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_excel(path, dtype=str).fillna('')
+
+    missing = [col for col in MASTER_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"{path} is missing column(s): {', '.join(missing)}")
+
+    return df[MASTER_COLUMNS].apply(lambda col: col.str.strip()).reset_index(drop=True)
+
+def _check_people(df):
+    """Returns (problems, bad) - readable problem list and a mask of the rows involved."""
+    problems = []
+    blank = df['ID_Number'] == ''
+    if blank.any():
+        rows = df.index[blank] + 2 # Spreadsheet row (header is row 1)
+        problems.append(f"blank ID_Number on row(s) {', '.join(str(r) for r in rows)}")
+    problems += _describe_duplicates(df, 'ID_Number', 'RFID_UID', 'card')
+    problems += _describe_duplicates(df[df['RFID_UID'] != ''], 'RFID_UID', 'ID_Number', 'ID')
+
+    bad = blank | df.duplicated(subset='ID_Number', keep=False)
+    bad |= (df['RFID_UID'] != '') & df.duplicated(subset='RFID_UID', keep=False)
+    return problems, bad
+
+def _describe_duplicates(df, key, other, other_label):
+    dupes = df[df.duplicated(subset=key, keep=False)]
+    return [
+        f"duplicate {key} {value} ({other_label}s {', '.join(group[other])})"
+        for value, group in dupes.groupby(key, sort=True)
+    ]
+
+def get_master_list():
+    """Loads the student/employee database."""
+    if not os.path.exists(MASTER_FILE):
+        return pd.DataFrame(columns=MASTER_COLUMNS) # Return empty if missing
+    # Force ID_Number to be string to prevent "2023..." becoming a number
+    return pd.read_excel(MASTER_FILE, dtype={'ID_Number': str, 'RFID_UID': str})
+
+def _append_csv(df, path):
+    df.to_csv(path, mode='a', index=False, header=not os.path.exists(path))
+
+def _replace_csv(df, path):
+    """Writes a whole CSV so readers never see it half-written."""
+    tmp_path = path + '.tmp'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _load_current(new, path):
+    """
+    Current snapshot. On first use, bootstraps version 1 from Master_List.xlsx.
+    Rows of Master_List.xlsx that break the registry rules (blank or duplicate
+    IDs, shared cards) are left out only if the incoming file `new` lists those
+    people again. Returns (current, note) - note says what was left out.
+    """
+    if os.path.exists(CURRENT_FILE):
+        return pd.read_csv(CURRENT_FILE, dtype=str, keep_default_na=False), None
+
+    if not os.path.exists(REGISTRY_DIR):
+        os.makedirs(REGISTRY_DIR)
+    if not os.path.exists(MASTER_FILE):
+        return pd.DataFrame(columns=MASTER_COLUMNS), None
+
+    current = _read_people(MASTER_FILE)
+    problems, bad = _check_people(current)
+    note = None
+    if problems:
+        listed = (current['ID_Number'] != '') & current['ID_Number'].isin(new['ID_Number'])
+        listed |= (current['RFID_UID'] != '') & current['RFID_UID'].isin(new['RFID_UID'])
+        unlisted = current[bad & ~listed]
+        if not unlisted.empty:
+            people = ', '.join(unlisted['ID_Number'].replace('', '(blank)').drop_duplicates())
+            raise ValueError(
+                f"{os.path.basename(MASTER_FILE)} cannot start the registry: " + "; ".join(problems) +
+                f". Fix it, or include these people in {os.path.basename(path)}: {people}"
+            )
+        note = (f"{bad.sum()} row(s) of {os.path.basename(MASTER_FILE)} were replaced by {os.path.basename(path)}: "
+                + "; ".join(problems))
+        current = current[~bad].reset_index(drop=True)
+
+    # The first version is only valid from now on: older visits keep the Program logged at tap time
+    version = get_current_version() + 1
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    history = current.assign(Version=version, Valid_From=now, Change='INSERT')
+    _append_csv(history[HISTORY_COLUMNS], HISTORY_FILE)
+    _replace_csv(current, CURRENT_FILE)
+    _append_csv(pd.DataFrame([{
+        'Version': version, 'Imported_At': now,
+        'Source': MASTER_FILE, 'Inserted': len(current), 'Updated': 0,
+        'Reissued': 0, 'Unchanged': 0, 'Missing': 0
+    }], columns=VERSION_COLUMNS), VERSIONS_FILE)
+    return current, note
+
+def get_current_version():
+    """Highest version recorded in history.csv (0 before the first import)."""
+    if not os.path.exists(HISTORY_FILE):
+        return 0
+    versions = pd.read_csv(HISTORY_FILE, usecols=['Version'])['Version']
+    return int(versions.max()) if not versions.empty else 0
+
+# ==========================================
+# TAP-SIDE UID INDEX
+# ==========================================
+
+def _reset_uid_index(source):
+    _uid_index.update(source=source, uids={}, by_id={}, history_offset=0, master_mtime=None)
+
+def _index_people(people):
+    """Applies person records (oldest first) to the UID index."""
+    uids, by_id = _uid_index['uids'], _uid_index['by_id']
+    for person in people:
+        person = {col: str(person[col]) for col in MASTER_COLUMNS}
+        old_uid = by_id.get(person['ID_Number'])
+        if old_uid and uids.get(old_uid, {}).get('ID_Number') == person['ID_Number']:
+            del uids[old_uid] # Card re-issued: the old card stops working
+        by_id[person['ID_Number']] = person['RFID_UID']
+        if person['RFID_UID']:
+            uids[person['RFID_UID']] = person
+
+def _read_history_tail():
+    """history.csv rows appended since the index last looked (complete lines only)."""
+    offset = _uid_index['history_offset']
+    with open(HISTORY_FILE, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read()
+    chunk = chunk[:chunk.rfind(b'\n') + 1] # An import may be mid-write
+    if not chunk:
+        return []
+
+    _uid_index['history_offset'] = offset + len(chunk)
+    return pd.read_csv(
+        io.BytesIO(chunk), dtype=str, keep_default_na=False,
+        header=0 if offset == 0 else None, names=None if offset == 0 else HISTORY_COLUMNS
+    ).to_dict('records')
+
+def lookup_uid(uid):
+    """
+    Returns the Master List entry for a card, or None if it isn't registered.
+    Once the registry exists, the index applies only the history.csv rows added
+    by new imports. Before the first import it is built from Master_List.xlsx
+    (reloaded whenever the file changes).
+    """
+    with _registry_lock:
+        if os.path.exists(HISTORY_FILE):
+            size = os.path.getsize(HISTORY_FILE)
+            if _uid_index['source'] != 'registry' or size < _uid_index['history_offset']:
+                _reset_uid_index('registry')
+            if size > _uid_index['history_offset']:
+                _index_people(_read_history_tail())
+        else:
+            mtime = os.path.getmtime(MASTER_FILE) if os.path.exists(MASTER_FILE) else None
+            if _uid_index['source'] != 'master' or mtime != _uid_index['master_mtime']:
+                _reset_uid_index('master')
+                master_df = get_master_list().fillna('').astype(str)
+                _uid_index['uids'] = {row['RFID_UID']: row for row in master_df[MASTER_COLUMNS].to_dict('records')}
+                _uid_index['master_mtime'] = mtime
+        return _uid_index['uids'].get(uid)
+
+# ==========================================
+# IMPORT PIPELINE
+# ==========================================
+
+def diff_people(current, new):
+    """
+    Compares a new master file against the current snapshot (both keyed by ID_Number).
+    Returns (inserts, updates, reissues, unchanged_count, missing_count).
+    Updates and reissues carry the new values plus the previous RFID_UID as 'Old_UID'.
+    """
+    merged = new.merge(current, on='ID_Number', how='left', suffixes=('', '_old'), indicator=True)
+    existing = merged['_merge'] == 'both'
+
+    changed = pd.Series(False, index=merged.index)
+    for col in DETAIL_COLUMNS:
+        changed |= existing & (merged[col] != merged[f"{col}_old"])
+    reissued = existing & (merged['RFID_UID'] != merged['RFID_UID_old'])
+
+    keep = MASTER_COLUMNS + ['Old_UID']
+    merged = merged.rename(columns={'RFID_UID_old': 'Old_UID'})
+    inserts = merged[~existing][MASTER_COLUMNS]
+    updates = merged[changed & ~reissued][keep]
+    reissues = merged[reissued][keep]
+
+    unchanged = int((existing & ~changed).sum())
+    missing = int((~current['ID_Number'].isin(new['ID_Number'])).sum())
+    return inserts, updates, reissues, unchanged, missing
+
+def import_master(path, write_master=False):
+    """
+    Applies a new master file as the next registry version.
+    Only inserts, updates and card re-issues are recorded. People missing from
+    the new file are kept (and counted) - nobody is deleted by an import.
+    The registry never reads Master_List.xlsx again, so it is only rewritten
+    when `write_master` is set (the snapshot command exports any version too).
+    Returns a summary dict.
+    """
+    new = read_people_file(path)
+
+    with _registry_lock:
+        current, note = _load_current(new, path)
+        inserts, updates, reissues, unchanged, missing = diff_people(current, new)
+        summary = {
+            'version': get_current_version(),
+            'inserted': len(inserts), 'updated': len(updates), 'reissued': len(reissues),
+            'unchanged': unchanged, 'missing': missing
+        }
+        if note:
+            summary['note'] = note
+        if inserts.empty and updates.empty and reissues.empty:
+            if write_master:
+                current.to_excel(MASTER_FILE, index=False, engine='xlsxwriter')
+            return summary
+
+        version = summary['version'] + 1
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        changes = pd.concat([
+            inserts.assign(Change='INSERT'),
+            updates[MASTER_COLUMNS].assign(Change='UPDATE'),
+            reissues[MASTER_COLUMNS].assign(Change='REISSUE')
+        ], ignore_index=True)
+
+        current = pd.concat([
+            current[~current['ID_Number'].isin(changes['ID_Number'])],
+            changes[MASTER_COLUMNS]
+        ], ignore_index=True)
+
+        # A card handed to someone new must not still belong to a person kept from before
+        clashes = _describe_duplicates(current[current['RFID_UID'] != ''], 'RFID_UID', 'ID_Number', 'ID')
+        if clashes:
+            raise ValueError(f"{path} was not imported: " + "; ".join(clashes))
+
+        # 1. APPEND ONLY THE CHANGED PEOPLE TO THE HISTORY
+        _append_csv(changes.assign(Version=version, Valid_From=now)[HISTORY_COLUMNS], HISTORY_FILE)
+
+        # 2. NEW CURRENT SNAPSHOT
+        _replace_csv(current, CURRENT_FILE)
+
+        _append_csv(pd.DataFrame([{
+            'Version': version, 'Imported_At': now, 'Source': os.path.basename(path),
+            'Inserted': summary['inserted'], 'Updated': summary['updated'],
+            'Reissued': summary['reissued'], 'Unchanged': unchanged, 'Missing': missing
+        }], columns=VERSION_COLUMNS), VERSIONS_FILE)
+
+        # 3. OPTIONAL MASTER LIST EXPORT (the slowest step on a large list)
+        if write_master:
+            current.to_excel(MASTER_FILE, index=False, engine='xlsxwriter')
+
+        # Running servers pick the new history rows up on their next tap (lookup_uid)
+        summary['version'] = version
+    return summary
+
+# ==========================================
+# QUERY-TIME JOIN
+# ==========================================
+
+def load_history():
+    """Registry history (cached until history.csv changes)."""
+    if not os.path.exists(HISTORY_FILE):
+        return pd.DataFrame(columns=HISTORY_COLUMNS)
+    mtime = os.path.getmtime(HISTORY_FILE)
+    if _history_cache['mtime'] != mtime:
+        df = pd.read_csv(HISTORY_FILE, dtype=str, keep_default_na=False)
+        df['Valid_From_Obj'] = pd.to_datetime(df['Valid_From'])
+        _history_cache['df'] = df.sort_values('Valid_From_Obj', kind='stable')
+        _history_cache['mtime'] = mtime
+    return _history_cache['df']
+
+def get_snapshot(version):
+    """Reconstructs the registry as it stood after import `version`."""
+    history = load_history()
+    history = history[history['Version'].astype(int) <= int(version)]
+    return history.drop_duplicates(subset='ID_Number', keep='last')[MASTER_COLUMNS].reset_index(drop=True)
+
+def join_registry(log_df):
+    """
+    Sets each visit's Program to the person's Department in the registry version
+    valid at Date_Logged + Time_In. Rows with no registry match keep their Program.
+    """
+    history = load_history()
+    if history.empty or log_df.empty or not {'ID_Number', 'Program'}.issubset(log_df.columns):
+        return log_df
+
+    df = log_df.copy()
+    visit_ts = pd.to_datetime(
+        df['Date_Logged'].astype(str) + ' ' + df['Time_In'].astype(str), errors='coerce'
+    )
+    visits = pd.DataFrame({
+        'Row': range(len(df)),
+        'ID_Number': df['ID_Number'].astype(str).values,
+        'Visit_TS': visit_ts.values
+    }).dropna(subset=['Visit_TS']).sort_values('Visit_TS')
+
+    joined = pd.merge_asof(
+        visits, history[['ID_Number', 'Department', 'Valid_From_Obj']],
+        left_on='Visit_TS', right_on='Valid_From_Obj', by='ID_Number', direction='backward'
+    ).dropna(subset=['Department'])
+
+    program_col = df.columns.get_loc('Program')
+    df.iloc[joined['Row'].values, program_col] = joined['Department'].values
+    return df
+
+# ==========================================
+# CLI: python registry.py import New_Master.xlsx [--write-master]
+#      python registry.py snapshot 3 Master_v3.xlsx
+# ==========================================
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    write_master = '--write-master' in sys.argv[2:]
+    args = [arg for arg in sys.argv if arg != '--write-master']
+    if command == 'import' and len(args) == 3:
+        path = args[2]
+        if not os.path.exists(path):
+            print(f"❌ Error: {path} not found.")
+            return
+
+        start = datetime.now()
+        try:
+            summary = import_master(path, write_master=write_master)
+        except ValueError as e:
+            print(f"❌ Error: {e}")
+            return
+        elapsed = (datetime.now() - start).total_seconds()
+        if 'note' in summary:
+            print(f"⚠️ {summary['note']}")
+        print(f"✅ Registry at version {summary['version']} ({elapsed:.1f}s): "
+              f"{summary['inserted']} inserted, {summary['updated']} updated, "
+              f"{summary['reissued']} card(s) re-issued, {summary['unchanged']} unchanged, "
+              f"{summary['missing']} not in file (kept).")
+        if write_master:
+            print(f"✅ Rewrote {MASTER_FILE}")
+
+    elif command == 'snapshot' and len(sys.argv) == 4 and sys.argv[2].isdigit():
+        version, out_path = int(sys.argv[2]), sys.argv[3]
+        if not 1 <= version <= get_current_version():
+            print(f"❌ Error: Version {version} does not exist.")
+            return
+        snapshot = get_snapshot(version)
+        snapshot.to_excel(out_path, index=False, engine='xlsxwriter')
+        print(f"✅ Wrote version {version} ({len(snapshot)} people) to {out_path}")
+
+    else:
+        print("Usage: python registry.py import <new_master.xlsx|.csv> [--write-master]")
+        print("       python registry.py snapshot <version> <output.xlsx>")
+
+if __name__ == "__main__":
+    main()
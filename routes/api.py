@@ -1,21 +1,14 @@
-import os
-import pandas as pd
+import hmac
 from datetime import datetime
 from flask import Blueprint, request, jsonify
-from utils import get_current_excel_path, load_excel_data, RECORD_DIR
+from utils import get_current_excel_path, load_excel_data, apply_tap, LOG_WRITE_LOCK
+from sync import record_tap, merge_events, get_cursor, get_sync_token, is_central_node
+from debounce import tap_debouncer
+from registry import lookup_uid
 
 # Create Blueprint
 api_bp = Blueprint('api', __name__)
 
-MASTER_FILE = "Master_List.xlsx"
-
-def get_master_list():
-    """Loads the student/employee database."""
-    if not os.path.exists(MASTER_FILE):
-        return pd.DataFrame() # Return empty if missing
-    # Force ID_Number to be string to prevent "2023..." becoming a number
-    return pd.read_excel(MASTER_FILE, dtype={'ID_Number': str, 'RFID_UID': str})
-
 @api_bp.route('/rfid_tap', methods=['POST'])
 def rfid_tap():
     """
@@ -28,19 +21,37 @@ def rfid_tap():
     if not uid:
         return jsonify({'status': 'error', 'message': 'No UID provided'}), 400
 
-    # 1. LOOKUP USER IN MASTER LIST
-    master_df = get_master_list()
-    user_row = master_df[master_df['RFID_UID'] == uid]
+    # The central node's logs are rebuilt from gate journals - a local write would be lost
+    if is_central_node():
+        return jsonify({'status': 'error', 'message': 'This is the central node. Tap at a gate.'}), 409
+
+    # 0. DUPLICATE READ? Answer with the original result, never touch the log
+    cached = tap_debouncer.get(uid)
+    if cached is not None:
+        return jsonify(cached)
+
+    with LOG_WRITE_LOCK:
+        # A duplicate may have been processed while this request waited for the log
+        cached = tap_debouncer.get(uid)
+        if cached is not None:
+            return jsonify(cached)
 
-    if user_row.empty:
-        return jsonify({'status': 'error', 'message': 'Card not registered.'}), 404
+        result, status_code = process_tap(uid)
+        if status_code == 200:
+            tap_debouncer.put(uid, result)
+
+    return jsonify(result), status_code
+
+def process_tap(uid):
+    """Runs one full tap cycle. Returns (response_dict, status_code)."""
+    # 1. LOOKUP USER IN MASTER LIST (In-memory UID index, kept current by registry imports)
+    user = lookup_uid(uid)
+
+    if user is None:
+        return {'status': 'error', 'message': 'Card not registered.'}, 404
 
     # Extract User Details
-    user = user_row.iloc[0]
-    id_number = str(user['ID_Number'])
     full_name = f"{user['First_Name']} {user['Last_Name']}"
-    role = user['Role']
-    program = user['Department']
 
     # 2. LOAD TODAY'S LOG FILE
     log_path = get_current_excel_path()
@@ -50,88 +61,80 @@ def rfid_tap():
     current_date = now.strftime("%Y-%m-%d")
     current_time = now.strftime("%H:%M")
 
-    # 3. CHECK LAST STATUS
-    # We filter the log to find this specific user's history
-    user_logs = log_df[log_df['ID_Number'] == id_number]
-    
-    action = "IN" # Default assumption
-    message = f"Welcome, {user['First_Name']}!"
-
-    if not user_logs.empty:
-        # Get the very last entry for this user
-        last_index = user_logs.index[-1]
-        last_entry = log_df.loc[last_index]
-        
-        # Check if the last session is "Open" (Time_Out is empty/NaN)
-        is_open = pd.isna(last_entry['Time_Out']) or str(last_entry['Time_Out']).strip() == '' or str(last_entry['Time_Out']) == 'nan'
-
-        if is_open:
-            # We found an open session. Now check the DATE.
-            last_date = str(last_entry['Date_Logged'])
-            
-            if last_date == current_date:
-                # SCENARIO: SAME DAY -> TAP OUT
-                log_df.at[last_index, 'Time_Out'] = current_time
-                action = "OUT"
-                message = f"Goodbye, {user['First_Name']}!"
-            else:
-                # SCENARIO: FORGOTTEN LOGOUT (Different Day)
-                # 1. Auto-close the old record (Set to 9:00 PM)
-                log_df.at[last_index, 'Time_Out'] = "21:00"
-                log_df.at[last_index, 'Notes'] = "Auto-Closed (Forgot Logout)"
-                
-                # 2. Create a NEW "IN" record for today (proceeds to logic below)
-                action = "IN"
-                message = f"Welcome Back, {user['First_Name']}! (Previous session auto-closed)"
-                
-                # Create new row
-                new_row = {
-                    'Type': role,
-                    'Last_Name': user['Last_Name'],
-                    'First_Name': user['First_Name'],
-                    'ID_Number': id_number,
-                    'Program': program,
-                    'Date_Logged': current_date,
-                    'Time_In': current_time,
-                    'Time_Out': None # Open session
-                }
-                log_df = pd.concat([log_df, pd.DataFrame([new_row])], ignore_index=True)
-
-        else:
-            # Last session was closed. Start a NEW one.
-            new_row = {
-                'Type': role,
-                'Last_Name': user['Last_Name'],
-                'First_Name': user['First_Name'],
-                'ID_Number': id_number,
-                'Program': program,
-                'Date_Logged': current_date,
-                'Time_In': current_time,
-                'Time_Out': None
-            }
-            log_df = pd.concat([log_df, pd.DataFrame([new_row])], ignore_index=True)
-
-    else:
-        # First time ever logging in this month
-        new_row = {
-            'Type': role,
-            'Last_Name': user['Last_Name'],
-            'First_Name': user['First_Name'],
-            'ID_Number': id_number,
-            'Program': program,
-            'Date_Logged': current_date,
-            'Time_In': current_time,
-            'Time_Out': None
-        }
-        log_df = pd.concat([log_df, pd.DataFrame([new_row])], ignore_index=True)
+    # 3. CHECK LAST STATUS & APPLY IN/OUT RULES
+    log_df, action, message = apply_tap(log_df, user, current_date, current_time)
 
     # 4. SAVE CHANGES
     log_df.to_excel(log_path, index=False)
 
-    return jsonify({
+    # 5. JOURNAL THE TAP (Gate nodes only - shipped to the central node by sync.py)
+    record_tap(uid, user, now)
+
+    return {
         'status': 'success',
         'action': action,
         'name': full_name,
         'time': current_time,
         'message': message
-    })
\ No newline at end of file
+    }, 200
+
+@api_bp.route('/tap_stats', methods=['GET'])
+def tap_stats():
+    """Debounce counters: processed taps, suppressed duplicate reads, cache evictions."""
+    return jsonify({'status': 'success', **tap_debouncer.stats()})
+
+# ==========================================
+# MULTI-GATE SYNC (Central node endpoints)
+# ==========================================
+
+def sync_rejected():
+    """Error response for sync calls this node must not serve, else None."""
+    if not is_central_node():
+        return jsonify({'status': 'error', 'message': 'This node is not the central node.'}), 403
+
+    # Pushes rewrite the merged logs - never accept them without a shared secret
+    token = get_sync_token()
+    if token is None:
+        return jsonify({'status': 'error', 'message': 'SYNC_TOKEN is not set on the central node.'}), 503
+    if not hmac.compare_digest(request.headers.get('X-Sync-Token', ''), token):
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    return None
+
+@api_bp.route('/sync/cursor', methods=['GET'])
+def sync_cursor():
+    """
+    Returns the last journal sequence merged for a gate.
+    Query: ?gate_id=GATE_A
+    """
+    rejected = sync_rejected()
+    if rejected:
+        return rejected
+
+    gate_id = request.args.get('gate_id')
+    if not gate_id:
+        return jsonify({'status': 'error', 'message': 'No gate_id provided'}), 400
+
+    return jsonify({'status': 'success', 'gate_id': gate_id, 'cursor': get_cursor(gate_id)})
+
+@api_bp.route('/sync/push', methods=['POST'])
+def sync_push():
+    """
+    Receives a journal delta from a gate and merges it into the central logs.
+    Expected JSON: { "gate_id": "GATE_A", "events": [ { "Seq": 1, "Timestamp": "...", ... } ] }
+    """
+    rejected = sync_rejected()
+    if rejected:
+        return rejected
+
+    data = request.get_json(silent=True) or {}
+    gate_id = data.get('gate_id')
+    events = data.get('events', [])
+
+    if not gate_id:
+        return jsonify({'status': 'error', 'message': 'No gate_id provided'}), 400
+
+    try:
+        result = merge_events(gate_id, events)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', 'gate_id': gate_id, **result})
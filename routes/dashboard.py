@@ -10,6 +10,7 @@ import pandas as pd
 from datetime import datetime
 from flask import Blueprint, render_template, request, redirect, url_for, session, send_file, jsonify
 from utils import RECORD_DIR, load_excel_data 
+from registry import join_registry
 
 # Create the Blueprint
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -147,6 +148,9 @@ def get_dashboard_data():
         if 'Time_In' not in df.columns:
             df['Time_In'] = "00:00"
 
+        # Department as registered at the time of each visit
+        df = join_registry(df)
+
         # --- APPLY ADVANCED FILTERS ---
         if filter_day:
             df = df[df['Date_Logged'].astype(str).str.endswith(f"-{filter_day}")]
@@ -257,6 +261,7 @@ def download_report():
     if not df.empty:
         if 'Date_Logged' not in df.columns: df['Date_Logged'] = datetime.now().strftime("%Y-%m-%d")
         if 'Time_In' not in df.columns: df['Time_In'] = "00:00"
+        df = join_registry(df)
         
         if f_day: df = df[df['Date_Logged'].astype(str).str.endswith(f"-{f_day}")]
         if f_hour: df = df[df['Time_In'].astype(str).str.startswith(f_hour)]
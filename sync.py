@@ -0,0 +1,357 @@
+import os
+import sys
+import json
+import threading
+import urllib.request
+import pandas as pd
+from datetime import datetime
+from dotenv import load_dotenv
+from utils import RECORD_DIR, LOG_WRITE_LOCK, get_excel_path, load_excel_data, apply_tap
+
+# ==========================================
+# CONFIGURATION & CONSTANTS
+# ==========================================
+# Multi-gate deployments: every entrance (or branch) runs its own copy of the app
+# with a GATE_ID. Each gate keeps serving taps from its local log when the link is
+# down, and journals every tap with a monotonically increasing sequence number.
+# The central node receives journal deltas and rebuilds the merged monthly logs.
+
+load_dotenv()
+
+GATES_DIR = os.path.join(RECORD_DIR, 'Gates')
+CENTRAL_DIR = os.path.join(RECORD_DIR, 'Central')
+STATE_FILE = os.path.join(CENTRAL_DIR, 'sync_state.json')
+
+JOURNAL_COLUMNS = [
+    'Seq', 'Gate_ID', 'Timestamp', 'RFID_UID',
+    'ID_Number', 'Type', 'Last_Name', 'First_Name', 'Program'
+]
+
+# Gate_ID given to taps recovered from rows a month log held before its first merge
+SEED_GATE_ID = 'LOCAL'
+
+_journal_lock = threading.Lock()
+_journal_seq = {}   # gate_id -> last sequence written (cached after first read)
+
+def get_gate_id():
+    """Returns this node's gate name, or None for a single-node install."""
+    return os.getenv('GATE_ID') or None
+
+def get_sync_token():
+    return os.getenv('SYNC_TOKEN') or None
+
+def is_central_node():
+    """The central node (SYNC_ROLE=central) only builds its logs from gate journals."""
+    return (os.getenv('SYNC_ROLE') or '').strip().lower() == 'central'
+
+# ==========================================
+# GATE SIDE: LOCAL TAP JOURNAL
+# ==========================================
+
+def get_journal_path(gate_id):
+    gate_folder = os.path.join(GATES_DIR, gate_id)
+    if not os.path.exists(gate_folder):
+        os.makedirs(gate_folder)
+    return os.path.join(gate_folder, 'journal.csv')
+
+def read_journal(gate_id, since=0):
+    """Loads journal events with Seq greater than `since`, oldest first."""
+    path = get_journal_path(gate_id)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=JOURNAL_COLUMNS)
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df['Seq'] = df['Seq'].astype(int)
+    return df[df['Seq'] > since].sort_values('Seq')
+
+def record_tap(uid, user, now):
+    """
+    Appends one tap to this gate's journal. Does nothing when GATE_ID is not set.
+    Returns the sequence number assigned to the tap.
+    """
+    gate_id = get_gate_id()
+    if not gate_id:
+        return None
+
+    with _journal_lock:
+        path = get_journal_path(gate_id)
+        if gate_id not in _journal_seq:
+            journal = read_journal(gate_id)
+            _journal_seq[gate_id] = int(journal['Seq'].max()) if not journal.empty else 0
+
+        seq = _journal_seq[gate_id] + 1
+        event = {
+            'Seq': seq,
+            'Gate_ID': gate_id,
+            'Timestamp': now.strftime("%Y-%m-%d %H:%M:%S"),
+            'RFID_UID': uid,
+            'ID_Number': str(user['ID_Number']),
+            'Type': user['Role'],
+            'Last_Name': user['Last_Name'],
+            'First_Name': user['First_Name'],
+            'Program': user['Department']
+        }
+        pd.DataFrame([event], columns=JOURNAL_COLUMNS).to_csv(
+            path, mode='a', index=False, header=not os.path.exists(path)
+        )
+        _journal_seq[gate_id] = seq
+    return seq
+
+def _request_json(url, payload=None):
+    headers = {'Content-Type': 'application/json'}
+    token = get_sync_token()
+    if token:
+        headers['X-Sync-Token'] = token
+    body = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url, data=body, headers=headers, method='POST' if body else 'GET')
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return json.loads(resp.read().decode('utf-8'))
+
+def push_journal(central_url, gate_id=None, batch_size=500):
+    """
+    Ships every journal event the central node has not merged yet.
+    The central cursor is authoritative, so a failed or repeated push is safe to retry.
+    Returns the number of events the central node accepted.
+    """
+    gate_id = gate_id or get_gate_id()
+    if not gate_id:
+        raise ValueError("GATE_ID is not set for this node.")
+    central_url = central_url.rstrip('/')
+
+    cursor = _request_json(f"{central_url}/api/sync/cursor?gate_id={gate_id}")['cursor']
+    pending = read_journal(gate_id, since=cursor)
+
+    pushed = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending.iloc[start:start + batch_size]
+        result = _request_json(f"{central_url}/api/sync/push", {
+            'gate_id': gate_id,
+            'events': batch.to_dict('records')
+        })
+        pushed += result['accepted']
+        if result['cursor'] < int(batch['Seq'].max()):
+            break # Central stopped at a gap - the next push resumes from its cursor
+    return pushed
+
+# ==========================================
+# CENTRAL SIDE: INCREMENTAL MERGE
+# ==========================================
+
+def _load_state():
+    if not os.path.exists(STATE_FILE):
+        return {'cursors': {}}
+    with open(STATE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_state(state):
+    if not os.path.exists(CENTRAL_DIR):
+        os.makedirs(CENTRAL_DIR)
+    tmp_path = STATE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_FILE)
+
+def get_cursor(gate_id):
+    """Last sequence number merged from `gate_id` (0 if never seen)."""
+    return _load_state()['cursors'].get(gate_id, 0)
+
+def _archive_path(month_key):
+    if not os.path.exists(CENTRAL_DIR):
+        os.makedirs(CENTRAL_DIR)
+    return os.path.join(CENTRAL_DIR, f"events_{month_key}.csv")
+
+def _load_archive(month_key):
+    path = _archive_path(month_key)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=JOURNAL_COLUMNS)
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    # A crash between archiving and saving the state can leave a re-pushed duplicate
+    return df.drop_duplicates(subset=['Gate_ID', 'Seq'])
+
+def validate_events(events):
+    """
+    Raises ValueError unless every event has an integer Seq, a Timestamp in
+    '%Y-%m-%d %H:%M:%S' format and an ID_Number.
+    """
+    if not isinstance(events, list):
+        raise ValueError("'events' must be a list.")
+    for event in events:
+        if not isinstance(event, dict):
+            raise ValueError("Each event must be an object.")
+        seq = event.get('Seq')
+        if isinstance(seq, bool) or not isinstance(seq, int):
+            raise ValueError(f"Invalid Seq: {seq!r}")
+        try:
+            datetime.strptime(str(event.get('Timestamp')), "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise ValueError(f"Invalid Timestamp for Seq {seq}: {event.get('Timestamp')!r}")
+        if not str(event.get('ID_Number') or '').strip():
+            raise ValueError(f"Missing ID_Number for Seq {seq}")
+
+def _seed_events(month_key):
+    """
+    Turns the rows a month log already holds (e.g. logged while this node was still
+    a single-node install) into archive events, so rebuilding that month never
+    loses them. Each row becomes an IN tap plus an OUT tap at Time_Out. An
+    auto-closed row gets no OUT when a later row of the same person will close it
+    again on replay. Raises ValueError if a row can't be turned back into taps.
+    """
+    log_df = load_excel_data(get_excel_path(month_key))
+    if log_df.empty:
+        return []
+
+    log_df = log_df.fillna('').astype(str)
+    last_row = {id_number: i for i, id_number in enumerate(log_df['ID_Number'])}
+
+    events = []
+    for i, row in enumerate(log_df.to_dict('records')):
+        taps = [row['Time_In'][:5]]
+        time_out = row['Time_Out'].strip()
+        auto_closed = row.get('Notes', '').startswith('Auto-Closed')
+        if time_out and (not auto_closed or last_row[row['ID_Number']] == i):
+            taps.append(time_out[:5])
+
+        for tap_time in taps:
+            timestamp = f"{row['Date_Logged'][:10]} {tap_time}:00"
+            try:
+                datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                raise ValueError(f"log_{month_key}.xlsx row {i + 2} can't be merged: "
+                                 f"unreadable date/time {timestamp!r}")
+            events.append({
+                'Seq': len(events) + 1, 'Gate_ID': SEED_GATE_ID, 'Timestamp': timestamp,
+                'RFID_UID': '', 'ID_Number': row['ID_Number'], 'Type': row['Type'],
+                'Last_Name': row['Last_Name'], 'First_Name': row['First_Name'],
+                'Program': row['Program']
+            })
+    return events
+
+def _event_user(event):
+    """Maps a journal event onto the Master List fields apply_tap expects."""
+    return {
+        'ID_Number': str(event['ID_Number']),
+        'Role': event['Type'],
+        'Last_Name': event['Last_Name'],
+        'First_Name': event['First_Name'],
+        'Department': event['Program']
+    }
+
+def _replay(log_df, events):
+    for event in events:
+        ts = str(event['Timestamp'])
+        log_df, _, _ = apply_tap(log_df, _event_user(event), ts[:10], ts[11:16])
+    return log_df
+
+def merge_events(gate_id, events):
+    """
+    Merges a delta of journal events from one gate into the central monthly logs.
+
+    - Validated: a malformed event rejects the whole delta (ValueError) and the
+      cursor stays where it was.
+    - Lossless: the first merge into a month seeds its archive with the rows the
+      log already holds, so rows not built by a merge survive the rebuild.
+    - Idempotent: events at or below the gate's cursor are ignored.
+    - Gap-safe: only the contiguous run after the cursor is accepted.
+    - Incremental: for each person with new taps, only their rows from the day
+      of their earliest new tap onward are rebuilt - from the deduplicated event
+      archive, in timestamp order across all gates. Rebuilding is repeatable, so
+      a merge that fails partway is safe to retry.
+
+    Returns {'accepted': <count>, 'cursor': <new cursor>}.
+    """
+    validate_events(events)
+
+    # Also serializes merges: cursors, archive and logs change together
+    with LOG_WRITE_LOCK:
+        state = _load_state()
+        cursor = state['cursors'].get(gate_id, 0)
+
+        # 1. KEEP ONLY THE NEW, CONTIGUOUS RUN OF EVENTS
+        accepted = []
+        for event in sorted(events, key=lambda e: e['Seq']):
+            seq = event['Seq']
+            if seq <= cursor:
+                continue
+            if seq != cursor + 1:
+                break
+            event = {col: event.get(col, '') for col in JOURNAL_COLUMNS}
+            event['Seq'] = seq
+            event['Gate_ID'] = gate_id
+            event['ID_Number'] = str(event['ID_Number'])
+            accepted.append(event)
+            cursor = seq
+
+        if not accepted:
+            return {'accepted': 0, 'cursor': cursor}
+
+        # 2. ARCHIVE RAW EVENTS (The logs are always rebuilt from here)
+        by_month = {}
+        for event in accepted:
+            ts = str(event['Timestamp'])
+            by_month.setdefault(ts[:4] + ts[5:7], []).append(event)
+
+        # First merge into a month: keep the rows its log already holds
+        seeds = {
+            month_key: _seed_events(month_key)
+            for month_key in by_month if not os.path.exists(_archive_path(month_key))
+        }
+        for month_key, month_events in by_month.items():
+            path = _archive_path(month_key)
+            pd.DataFrame(seeds.get(month_key, []) + month_events, columns=JOURNAL_COLUMNS).to_csv(
+                path, mode='a', index=False, header=not os.path.exists(path)
+            )
+
+        # 3. RE-RUN IN/OUT RULES PER PERSON, IN TIMESTAMP ORDER
+        order = lambda e: (str(e['Timestamp']), e['Gate_ID'], int(e['Seq']))
+
+        for month_key, month_events in sorted(by_month.items()):
+            log_path = get_excel_path(month_key)
+            log_df = load_excel_data(log_path)
+            archive = _load_archive(month_key)
+            archive_day = archive['Timestamp'].str.slice(0, 10)
+
+            replay_from = {}
+            for event in month_events:
+                day = str(event['Timestamp'])[:10]
+                replay_from[event['ID_Number']] = min(replay_from.get(event['ID_Number'], day), day)
+
+            for id_number, from_day in replay_from.items():
+                # Drop this person's rows from that day on, then replay every tap we hold
+                if not log_df.empty:
+                    stale = (log_df['ID_Number'] == id_number) & \
+                            (log_df['Date_Logged'].astype(str) >= from_day)
+                    log_df = log_df[~stale].reset_index(drop=True)
+                history = archive[(archive['ID_Number'] == id_number) & (archive_day >= from_day)]
+                log_df = _replay(log_df, sorted(history.to_dict('records'), key=order))
+
+            # Keep the file chronological so each person's last row stays their latest session
+            log_df = log_df.sort_values(['Date_Logged', 'Time_In'], kind='stable').reset_index(drop=True)
+            log_df.to_excel(log_path, index=False)
+
+        # 4. ADVANCE CURSOR ONLY AFTER THE LOGS ARE WRITTEN
+        state['cursors'][gate_id] = cursor
+        _save_state(state)
+
+    return {'accepted': len(accepted), 'cursor': cursor}
+
+# ==========================================
+# CLI: python sync.py push [CENTRAL_URL]
+# ==========================================
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != 'push':
+        print("Usage: python sync.py push [CENTRAL_URL]")
+        return
+
+    central_url = sys.argv[2] if len(sys.argv) > 2 else os.getenv('CENTRAL_URL')
+    if not central_url:
+        print("❌ Error: No central URL given and CENTRAL_URL is not set.")
+        return
+
+    try:
+        pushed = push_journal(central_url)
+        print(f"✅ Pushed {pushed} event(s) from gate '{get_gate_id()}' to {central_url}")
+    except Exception as e:
+        print(f"❌ Sync failed (will retry on next run): {e}")
+
+if __name__ == "__main__":
+    main()
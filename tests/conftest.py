@@ -0,0 +1,49 @@
+import os
+import sys
+import pytest
+
+# Tests import the app modules the same way app.py does (from the project root)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+import sync
+import registry
+
+# Master List rows shared by the tap, debounce and registry tests
+PEOPLE = [
+    {'RFID_UID': 'AAAA0001', 'ID_Number': '2024000001', 'Last_Name': 'Cruz',
+     'First_Name': 'Ana', 'Department': 'SOIT', 'Role': 'Student'},
+    {'RFID_UID': 'BBBB0002', 'ID_Number': '2024000002', 'Last_Name': 'Reyes',
+     'First_Name': 'Ben', 'Department': 'SMDA', 'Role': 'Student'},
+    {'RFID_UID': 'CCCC0003', 'ID_Number': 'E-1001', 'Last_Name': 'Santos',
+     'First_Name': 'Cora', 'Department': 'DLA', 'Role': 'Employee'},
+]
+
+@pytest.fixture
+def record_dir(tmp_path, monkeypatch):
+    """
+    Points every Record/-derived path (logs, gate journals, central archive,
+    registry) and Master_List.xlsx at a temporary folder, with empty caches.
+    """
+    record = tmp_path / 'Record'
+    record.mkdir()
+    monkeypatch.setattr(utils, 'RECORD_DIR', str(record))
+
+    monkeypatch.setattr(sync, 'GATES_DIR', str(record / 'Gates'))
+    monkeypatch.setattr(sync, 'CENTRAL_DIR', str(record / 'Central'))
+    monkeypatch.setattr(sync, 'STATE_FILE', str(record / 'Central' / 'sync_state.json'))
+    monkeypatch.setattr(sync, '_journal_seq', {})
+
+    registry_dir = record / 'Registry'
+    monkeypatch.setattr(registry, 'MASTER_FILE', str(tmp_path / 'Master_List.xlsx'))
+    monkeypatch.setattr(registry, 'REGISTRY_DIR', str(registry_dir))
+    monkeypatch.setattr(registry, 'CURRENT_FILE', str(registry_dir / 'current.csv'))
+    monkeypatch.setattr(registry, 'HISTORY_FILE', str(registry_dir / 'history.csv'))
+    monkeypatch.setattr(registry, 'VERSIONS_FILE', str(registry_dir / 'versions.csv'))
+    monkeypatch.setattr(registry, '_uid_index', dict(registry._uid_index))
+    monkeypatch.setattr(registry, '_history_cache', {'mtime': None, 'df': None})
+    registry._reset_uid_index(None)
+
+    for name in ['GATE_ID', 'SYNC_ROLE', 'SYNC_TOKEN']:
+        monkeypatch.delenv(name, raising=False)
+    return tmp_path
@@ -0,0 +1,129 @@
+import threading
+import pytest
+
+import utils
+import routes.api
+from app import app
+from conftest import PEOPLE
+from debounce import TapDebouncer, read_setting
+
+CARDS = {person['RFID_UID']: person for person in PEOPLE}
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def reader(record_dir, monkeypatch):
+    """Replays (seconds, uid) traces through /api/rfid_tap with a 2s debounce window."""
+    monkeypatch.setattr(routes.api, 'lookup_uid', CARDS.get)
+
+    clock = FakeClock()
+    debouncer = TapDebouncer(window_seconds=2, max_entries=2, clock=clock)
+    monkeypatch.setattr(routes.api, 'tap_debouncer', debouncer)
+    client = app.test_client()
+
+    def replay(trace):
+        responses = []
+        for at, uid in trace:
+            clock.now = at
+            responses.append(client.post('/api/rfid_tap', json={'uid': uid}).json)
+        return responses
+
+    replay.debouncer = debouncer
+    replay.client = client
+    return replay
+
+def log_rows():
+    return len(utils.load_excel_data(utils.get_current_excel_path()))
+
+def test_triple_read_is_one_tap(reader):
+    responses = reader([(0.0, 'AAAA0001'), (0.3, 'AAAA0001'), (0.8, 'AAAA0001')])
+
+    assert [r['action'] for r in responses] == ['IN', 'IN', 'IN']
+    assert responses[1] == responses[0] and responses[2] == responses[0]
+    assert log_rows() == 1
+    stats = reader.debouncer.stats()
+    assert (stats['processed'], stats['suppressed'], stats['evicted']) == (1, 2, 0)
+
+def test_interleaved_burst(reader):
+    responses = reader([
+        (0.0, 'AAAA0001'), (0.1, 'BBBB0002'), (0.2, 'AAAA0001'),
+        (0.3, 'BBBB0002'), (0.5, 'AAAA0001'),
+    ])
+
+    assert [r['name'] for r in responses] == ['Ana Cruz', 'Ben Reyes', 'Ana Cruz', 'Ben Reyes', 'Ana Cruz']
+    assert all(r['action'] == 'IN' for r in responses)
+    assert log_rows() == 2
+    stats = reader.debouncer.stats()
+    assert (stats['processed'], stats['suppressed']) == (2, 3)
+
+def test_repeat_after_window_is_a_real_tap(reader):
+    responses = reader([(0.0, 'AAAA0001'), (1.0, 'AAAA0001'), (2.5, 'AAAA0001')])
+
+    assert [r['action'] for r in responses] == ['IN', 'IN', 'OUT']
+    assert log_rows() == 1 # Same session, now closed
+    stats = reader.debouncer.stats()
+    assert (stats['processed'], stats['suppressed']) == (2, 1)
+
+def test_cache_is_bounded(reader):
+    # Capacity 2: the third card evicts the first, so its repeat is processed again
+    reader([(0.0, 'AAAA0001'), (0.1, 'BBBB0002'), (0.2, 'CCCC0003'), (0.3, 'AAAA0001')])
+
+    stats = reader.debouncer.stats()
+    assert stats['cached'] == 2
+    assert (stats['processed'], stats['suppressed'], stats['evicted']) == (4, 0, 2)
+
+def test_unregistered_cards_are_not_cached(reader):
+    responses = reader([(0.0, 'FFFF9999'), (0.1, 'FFFF9999')])
+
+    assert [r['status'] for r in responses] == ['error', 'error']
+    assert reader.debouncer.stats()['suppressed'] == 0
+
+def test_stats_endpoint_exposes_no_uids(reader):
+    reader([(0.0, 'AAAA0001'), (0.2, 'AAAA0001')])
+
+    body = reader.client.get('/api/tap_stats').get_data(as_text=True)
+    assert 'AAAA0001' not in body
+    assert reader.client.get('/api/tap_stats').json['suppressed'] == 1
+
+def test_concurrent_duplicates_are_processed_once(reader):
+    barrier = threading.Barrier(4)
+    responses = []
+
+    def read_card():
+        barrier.wait()
+        responses.append(reader.client.post('/api/rfid_tap', json={'uid': 'AAAA0001'}).json)
+
+    threads = [threading.Thread(target=read_card) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [r['action'] for r in responses] == ['IN'] * 4
+    assert log_rows() == 1
+    stats = reader.debouncer.stats()
+    assert (stats['processed'], stats['suppressed']) == (1, 3)
+
+@pytest.mark.parametrize('raw, expected', [
+    (None, 1024), ('', 1024), ('256', 256), ('0', 1024), ('-5', 1024), ('many', 1024), ('1.5', 1024),
+])
+def test_max_entries_setting_falls_back_to_default(monkeypatch, raw, expected):
+    if raw is None:
+        monkeypatch.delenv('TAP_DEBOUNCE_MAX_ENTRIES', raising=False)
+    else:
+        monkeypatch.setenv('TAP_DEBOUNCE_MAX_ENTRIES', raw)
+    assert read_setting('TAP_DEBOUNCE_MAX_ENTRIES', 1024, int, 1) == expected
+
+@pytest.mark.parametrize('raw, expected', [('0.75', 0.75), ('0', 0.0), ('-1', 2.0), ('nan', 2.0), ('soon', 2.0)])
+def test_window_setting_falls_back_to_default(monkeypatch, raw, expected):
+    monkeypatch.setenv('TAP_DEBOUNCE_SECONDS', raw)
+    assert read_setting('TAP_DEBOUNCE_SECONDS', 2.0, float, 0) == expected
+
+def test_cache_needs_room_for_one_card():
+    with pytest.raises(ValueError):
+        TapDebouncer(window_seconds=2, max_entries=0)
@@ -0,0 +1,158 @@
+import os
+import time
+import pandas as pd
+import pytest
+
+import registry
+from conftest import PEOPLE
+
+@pytest.fixture
+def reg(record_dir):
+    """Registry with a temporary Master_List.xlsx holding PEOPLE."""
+    pd.DataFrame(PEOPLE).to_excel(registry.MASTER_FILE, index=False)
+    return record_dir
+
+def write_master(tmp_path, people, name='New_Master.csv'):
+    path = str(tmp_path / name)
+    pd.DataFrame(people).to_csv(path, index=False)
+    return path
+
+def test_import_applies_only_changes(reg):
+    ana, ben, cora = [dict(p) for p in PEOPLE]
+    ben['Department'] = 'SOIT'                  # Update
+    cora['RFID_UID'] = 'DDDD0004'               # Card re-issue
+    dan = {**ana, 'RFID_UID': 'EEEE0005', 'ID_Number': '2025000009', 'First_Name': 'Dan'}
+
+    summary = registry.import_master(write_master(reg, [ana, ben, cora, dan]))
+
+    assert summary == {'version': 2, 'inserted': 1, 'updated': 1, 'reissued': 1,
+                       'unchanged': 1, 'missing': 0}
+    history = pd.read_csv(registry.HISTORY_FILE, dtype=str)
+    assert (history['Version'] == '2').sum() == 3
+    assert registry.lookup_uid('CCCC0003') is None
+    assert registry.lookup_uid('DDDD0004')['ID_Number'] == 'E-1001'
+    assert registry.lookup_uid('BBBB0002')['Department'] == 'SOIT'
+    assert registry.get_snapshot(1).set_index('ID_Number').loc['2024000002', 'Department'] == 'SMDA'
+
+def test_missing_people_are_kept(reg):
+    summary = registry.import_master(write_master(reg, PEOPLE[:2]))
+
+    assert summary['missing'] == 1
+    assert registry.lookup_uid('CCCC0003')['ID_Number'] == 'E-1001'
+
+@pytest.mark.parametrize('people, message', [
+    ([PEOPLE[0], {**PEOPLE[1], 'ID_Number': PEOPLE[0]['ID_Number']}],
+     "duplicate ID_Number 2024000001 (cards AAAA0001, BBBB0002)"),
+    ([PEOPLE[0], {**PEOPLE[1], 'RFID_UID': PEOPLE[0]['RFID_UID']}],
+     "duplicate RFID_UID AAAA0001 (IDs 2024000001, 2024000002)"),
+    ([PEOPLE[0], {**PEOPLE[1], 'ID_Number': ''}], "blank ID_Number on row(s) 3"),
+])
+def test_bad_rows_reject_the_file(reg, people, message):
+    with pytest.raises(ValueError, match=message.replace('(', r'\(').replace(')', r'\)')):
+        registry.import_master(write_master(reg, people))
+    assert registry.get_current_version() <= 1
+
+# Ben's row reuses Cora's ID with a new card, like the shipped Master_List.xlsx
+CLASHING_MASTER = PEOPLE + [{**PEOPLE[1], 'RFID_UID': 'FFFF0006', 'ID_Number': 'E-1001'}]
+
+def test_invalid_master_list_names_the_people_to_import(reg):
+    pd.DataFrame(CLASHING_MASTER).to_excel(registry.MASTER_FILE, index=False)
+
+    with pytest.raises(ValueError) as error:
+        registry.import_master(write_master(reg, PEOPLE[:2]))
+    message = str(error.value)
+    assert "Master_List.xlsx cannot start the registry" in message
+    assert "duplicate ID_Number E-1001 (cards CCCC0003, FFFF0006)" in message
+    assert message.endswith("include these people in New_Master.csv: E-1001")
+    assert registry.get_current_version() == 0
+    # Before any import, every card in Master_List.xlsx still taps in
+    assert registry.lookup_uid('CCCC0003')['ID_Number'] == 'E-1001'
+    assert registry.lookup_uid('FFFF0006')['ID_Number'] == 'E-1001'
+
+def test_import_listing_the_clashing_people_starts_the_registry(reg):
+    pd.DataFrame(CLASHING_MASTER).to_excel(registry.MASTER_FILE, index=False)
+
+    summary = registry.import_master(write_master(reg, PEOPLE))
+
+    assert (summary['version'], summary['inserted'], summary['unchanged']) == (2, 1, 2)
+    assert summary['note'].startswith("2 row(s) of Master_List.xlsx were replaced by New_Master.csv")
+    assert registry.get_snapshot(1)['ID_Number'].tolist() == ['2024000001', '2024000002']
+    assert registry.lookup_uid('CCCC0003')['First_Name'] == 'Cora'
+    assert registry.lookup_uid('FFFF0006') is None
+
+def test_crash_after_history_does_not_reuse_the_version(reg, monkeypatch):
+    registry.import_master(write_master(reg, PEOPLE))
+
+    def crash(df, path):
+        raise OSError("disk full")
+    # history.csv gets version 2, but current.csv and versions.csv are never written
+    with monkeypatch.context() as m:
+        m.setattr(registry, '_replace_csv', crash)
+        with pytest.raises(OSError):
+            registry.import_master(write_master(reg, [{**PEOPLE[0], 'Department': 'SMDA'}]))
+
+    summary = registry.import_master(write_master(reg, [{**PEOPLE[0], 'Department': 'DLA'}]))
+
+    assert summary['version'] == 3
+    history = pd.read_csv(registry.HISTORY_FILE, dtype=str)
+    assert history.groupby('Version').size().to_dict() == {'1': 3, '2': 1, '3': 1}
+    assert registry.lookup_uid('AAAA0001')['Department'] == 'DLA'
+
+def test_reissued_card_cannot_clash_with_a_kept_person(reg):
+    # Ben is not in the file (kept), and Ana is handed Ben's card
+    with pytest.raises(ValueError, match="duplicate RFID_UID BBBB0002"):
+        registry.import_master(write_master(reg, [{**PEOPLE[0], 'RFID_UID': 'BBBB0002'}]))
+
+def test_index_follows_history_without_reload(reg):
+    registry.import_master(write_master(reg, PEOPLE))
+    assert registry.lookup_uid('AAAA0001')['First_Name'] == 'Ana'
+    uids = registry._uid_index['uids']
+    offset = registry._uid_index['history_offset']
+
+    # Same as an import run by another process: only history.csv changes under the server
+    registry.import_master(write_master(reg, [{**PEOPLE[0], 'RFID_UID': 'AAAA9999'}]))
+
+    assert registry.lookup_uid('AAAA9999')['ID_Number'] == '2024000001'
+    assert registry.lookup_uid('AAAA0001') is None
+    assert registry._uid_index['uids'] is uids
+    assert registry._uid_index['history_offset'] > offset
+
+def test_join_keeps_logged_program_before_first_import(reg):
+    registry.import_master(write_master(reg, [{**PEOPLE[0], 'Department': 'SMDA'}]))
+    logs = pd.DataFrame([
+        {'ID_Number': '2024000001', 'Program': 'SOIT', 'Date_Logged': '2025-10-01', 'Time_In': '09:00'},
+        {'ID_Number': '2024000001', 'Program': 'SOIT', 'Date_Logged': '2099-01-01', 'Time_In': '09:00'},
+    ])
+
+    assert registry.join_registry(logs)['Program'].tolist() == ['SOIT', 'SMDA']
+
+def test_master_list_is_only_rewritten_on_request(reg):
+    before = os.path.getmtime(registry.MASTER_FILE)
+    registry.import_master(write_master(reg, [{**PEOPLE[0], 'Department': 'SMDA'}]))
+    assert os.path.getmtime(registry.MASTER_FILE) == before
+
+    registry.import_master(write_master(reg, [{**PEOPLE[1], 'Department': 'DLA'}]), write_master=True)
+    rewritten = registry.read_people_file(registry.MASTER_FILE).set_index('ID_Number')
+    assert rewritten.loc[['2024000001', '2024000002'], 'Department'].tolist() == ['SMDA', 'DLA']
+
+def test_50k_person_import_takes_seconds(reg):
+    people = pd.DataFrame({
+        'RFID_UID': [f"{n:08X}" for n in range(50000)],
+        'ID_Number': [f"{2020000000 + n}" for n in range(50000)],
+        'Last_Name': 'Cruz', 'First_Name': [f"Person {n}" for n in range(50000)],
+        'Department': 'SOIT', 'Role': 'Student',
+    })
+    registry.import_master(write_master(reg, people.to_dict('records')))
+
+    # Semester update: 1,000 program changes and 100 lost cards re-issued
+    people.loc[:999, 'Department'] = 'SMDA'
+    people.loc[1000:1099, 'RFID_UID'] = [f"F{n:07X}" for n in range(100)]
+    path = write_master(reg, people.to_dict('records'))
+
+    start = time.perf_counter()
+    summary = registry.import_master(path)
+    elapsed = time.perf_counter() - start
+
+    assert (summary['updated'], summary['reissued'], summary['unchanged']) == (1000, 100, 48900)
+    assert registry.lookup_uid('F0000063')['ID_Number'] == '2020001099'
+    assert elapsed < 10, f"50k import took {elapsed:.1f}s"
@@ -0,0 +1,235 @@
+import os
+import threading
+import pandas as pd
+import pytest
+from datetime import datetime
+from werkzeug.serving import make_server
+
+import sync
+import utils
+from app import app
+from conftest import PEOPLE
+
+MONTH = "202511"
+TOKEN = "test-secret"
+
+@pytest.fixture
+def central(record_dir, monkeypatch):
+    """Flask client for a central node writing into a temporary Record folder."""
+    monkeypatch.setenv('SYNC_ROLE', 'central')
+    monkeypatch.setenv('SYNC_TOKEN', TOKEN)
+    app.config['TESTING'] = True
+    client = app.test_client()
+    client.environ_base['HTTP_X_SYNC_TOKEN'] = TOKEN
+    return client
+
+@pytest.fixture
+def central_url(central):
+    """The central node served on a local port, for gate-side push_journal calls."""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    thread.join()
+
+@pytest.fixture
+def gate(monkeypatch):
+    """This process also acts as gate GATE_A; records every request push_journal makes."""
+    monkeypatch.setenv('GATE_ID', 'GATE_A')
+    calls = []
+    request_json = sync._request_json
+
+    def spy(url, payload=None):
+        calls.append(url.rsplit('/', 1)[-1].split('?')[0])
+        return request_json(url, payload)
+
+    monkeypatch.setattr(sync, '_request_json', spy)
+    return calls
+
+def tap(seq, timestamp, id_number="2024000001", first_name="Ana"):
+    return {
+        'Seq': seq, 'Timestamp': timestamp, 'RFID_UID': 'A1B2C3D4',
+        'ID_Number': id_number, 'Type': 'Student', 'Last_Name': 'Cruz',
+        'First_Name': first_name, 'Program': 'SOIT'
+    }
+
+def push(client, gate_id, events):
+    return client.post('/api/sync/push', json={'gate_id': gate_id, 'events': events})
+
+def sessions(id_number="2024000001"):
+    """(Date_Logged, Time_In, Time_Out, Notes) rows of one person in the test month."""
+    df = utils.load_excel_data(utils.get_excel_path(MONTH)).fillna('')
+    df = df[df['ID_Number'] == id_number]
+    return [tuple(str(v) for v in row) for row in df[['Date_Logged', 'Time_In', 'Time_Out', 'Notes']].values]
+
+def test_out_of_order_merge_across_gates(central):
+    resp = push(central, 'GATE_A', [tap(1, "2025-11-03 10:00:00"), tap(2, "2025-11-03 12:00:00")])
+    assert resp.status_code == 200 and resp.json['cursor'] == 2
+    assert sessions() == [("2025-11-03", "10:00", "12:00", "")]
+
+    # Gate B was offline; its 11:00 tap belongs between gate A's two taps
+    resp = push(central, 'GATE_B', [tap(1, "2025-11-03 11:00:00")])
+    assert resp.json['accepted'] == 1
+    assert sessions() == [
+        ("2025-11-03", "10:00", "11:00", ""),
+        ("2025-11-03", "12:00", "", ""),
+    ]
+
+def test_repush_is_a_no_op(central):
+    events = [tap(1, "2025-11-03 10:00:00"), tap(2, "2025-11-03 12:00:00")]
+    push(central, 'GATE_A', events)
+    before = sessions()
+
+    resp = push(central, 'GATE_A', events)
+    assert resp.json['accepted'] == 0 and resp.json['cursor'] == 2
+    assert sessions() == before
+
+def test_retry_after_crash_before_cursor_save(central):
+    events = [tap(1, "2025-11-03 10:00:00"), tap(2, "2025-11-03 12:00:00")]
+    push(central, 'GATE_A', events)
+    before = sessions()
+
+    # Logs and archive were written, but the cursor never was
+    os.remove(sync.STATE_FILE)
+    resp = push(central, 'GATE_A', events)
+    assert resp.json['accepted'] == 2
+    assert sessions() == before
+
+def test_gap_stops_at_cursor(central):
+    resp = push(central, 'GATE_A', [
+        tap(1, "2025-11-03 10:00:00"), tap(2, "2025-11-03 11:00:00"), tap(4, "2025-11-03 13:00:00")
+    ])
+    assert resp.json['accepted'] == 2 and resp.json['cursor'] == 2
+    assert central.get('/api/sync/cursor?gate_id=GATE_A').json['cursor'] == 2
+
+    resp = push(central, 'GATE_A', [tap(3, "2025-11-03 12:00:00"), tap(4, "2025-11-03 13:00:00")])
+    assert resp.json['cursor'] == 4
+    assert sessions() == [
+        ("2025-11-03", "10:00", "11:00", ""),
+        ("2025-11-03", "12:00", "13:00", ""),
+    ]
+
+def test_late_tap_rebuilds_that_day(central):
+    push(central, 'GATE_A', [tap(1, "2025-11-03 10:00:00"), tap(2, "2025-11-04 09:00:00")])
+    assert sessions() == [
+        ("2025-11-03", "10:00", "21:00", "Auto-Closed (Forgot Logout)"),
+        ("2025-11-04", "09:00", "", ""),
+    ]
+
+    # The tap-out on the 3rd arrives late from another gate
+    push(central, 'GATE_B', [tap(1, "2025-11-03 15:00:00")])
+    assert sessions() == [
+        ("2025-11-03", "10:00", "15:00", ""),
+        ("2025-11-04", "09:00", "", ""),
+    ]
+
+@pytest.mark.parametrize('event', [
+    {'Seq': 1, 'ID_Number': '2024000001'},
+    {**tap(1, "2025-11-03 10:00:00"), 'Timestamp': "03/11/2025 10:00"},
+    {**tap(1, "2025-11-03 10:00:00"), 'Seq': "one"},
+    {**tap(1, "2025-11-03 10:00:00"), 'ID_Number': ""},
+])
+def test_malformed_event_is_rejected(central, event):
+    resp = push(central, 'GATE_A', [event])
+    assert resp.status_code == 400
+    assert central.get('/api/sync/cursor?gate_id=GATE_A').json['cursor'] == 0
+    assert not os.path.exists(sync.CENTRAL_DIR) or not any(
+        f.startswith('events_') for f in os.listdir(sync.CENTRAL_DIR)
+    )
+
+def test_central_node_refuses_local_taps(central):
+    resp = central.post('/api/rfid_tap', json={'uid': 'A1B2C3D4'})
+    assert resp.status_code == 409
+
+def write_log(rows):
+    """Rows the month log held before the node became central (ID 2024000001)."""
+    base = {'Type': 'Student', 'Last_Name': 'Cruz', 'First_Name': 'Ana',
+            'ID_Number': '2024000001', 'Program': 'SOIT'}
+    columns = utils.LOG_COLUMNS
+    pd.DataFrame([{**base, **row} for row in rows], columns=columns) \
+        .to_excel(utils.get_excel_path(MONTH), index=False)
+
+def test_rows_logged_before_first_merge_are_kept(central):
+    write_log([{'Date_Logged': '2025-11-03', 'Time_In': '08:00', 'Time_Out': '09:00', 'Notes': ''}])
+
+    push(central, 'GATE_A', [tap(1, "2025-11-03 10:00:00")])
+    assert sessions() == [
+        ("2025-11-03", "08:00", "09:00", ""),
+        ("2025-11-03", "10:00", "", ""),
+    ]
+
+    # Later merges rebuild the same day from the seeded archive
+    push(central, 'GATE_A', [tap(2, "2025-11-03 11:00:00")])
+    assert sessions() == [
+        ("2025-11-03", "08:00", "09:00", ""),
+        ("2025-11-03", "10:00", "11:00", ""),
+    ]
+
+def test_open_local_session_is_closed_once(central):
+    write_log([
+        {'Date_Logged': '2025-11-01', 'Time_In': '08:00', 'Time_Out': '21:00',
+         'Notes': 'Auto-Closed (Forgot Logout)'},
+        {'Date_Logged': '2025-11-03', 'Time_In': '08:00', 'Time_Out': '', 'Notes': ''},
+    ])
+
+    push(central, 'GATE_A', [tap(1, "2025-11-03 10:00:00")])
+    push(central, 'GATE_B', [tap(1, "2025-11-03 12:00:00")])
+    assert sessions() == [
+        ("2025-11-01", "08:00", "21:00", "Auto-Closed (Forgot Logout)"),
+        ("2025-11-03", "08:00", "10:00", ""),
+        ("2025-11-03", "12:00", "", ""),
+    ]
+
+def test_unreadable_local_row_refuses_the_merge(central):
+    write_log([{'Date_Logged': 'yesterday', 'Time_In': '08:00', 'Time_Out': '', 'Notes': ''}])
+
+    resp = push(central, 'GATE_A', [tap(1, "2025-11-03 10:00:00")])
+    assert resp.status_code == 400
+    assert central.get('/api/sync/cursor?gate_id=GATE_A').json['cursor'] == 0
+
+def record(*times):
+    """Journals one tap per 'YYYY-MM-DD HH:MM' for Ana at gate GATE_A."""
+    return [sync.record_tap(PEOPLE[0]['RFID_UID'], PEOPLE[0], datetime.strptime(t, "%Y-%m-%d %H:%M"))
+            for t in times]
+
+def test_journal_sequence_survives_restart(record_dir, gate):
+    assert record("2025-11-03 08:00", "2025-11-03 09:00", "2025-11-03 10:00") == [1, 2, 3]
+
+    sync._journal_seq.clear() # A restarted gate re-reads its journal
+    assert record("2025-11-03 11:00") == [4]
+    assert sync.read_journal('GATE_A', since=2)['Seq'].tolist() == [3, 4]
+
+def test_push_journal_round_trip(central_url, gate):
+    record("2025-11-03 08:00", "2025-11-03 09:00", "2025-11-03 10:00",
+           "2025-11-03 11:00", "2025-11-04 08:00")
+
+    assert sync.push_journal(central_url, batch_size=2) == 5
+    assert gate == ['cursor', 'push', 'push', 'push']
+    assert sessions() == [
+        ("2025-11-03", "08:00", "09:00", ""),
+        ("2025-11-03", "10:00", "11:00", ""),
+        ("2025-11-04", "08:00", "", ""),
+    ]
+
+    # Nothing new: only the cursor is asked for
+    gate.clear()
+    assert sync.push_journal(central_url, batch_size=2) == 0
+    assert gate == ['cursor']
+
+def test_push_journal_stops_at_gap(central_url, gate):
+    record(*[f"2025-11-03 0{h}:00" for h in range(1, 7)])
+    journal = sync.read_journal('GATE_A')
+    journal[journal['Seq'] != 3].to_csv(sync.get_journal_path('GATE_A'), index=False)
+
+    assert sync.push_journal(central_url, batch_size=2) == 2
+    assert gate == ['cursor', 'push', 'push'] # Batch [4, 5] hit the gap - [6] is never sent
+    assert sync.get_cursor('GATE_A') == 2
+
+def test_central_requires_a_sync_token(central, monkeypatch):
+    monkeypatch.delenv('SYNC_TOKEN')
+    assert push(central, 'GATE_A', [tap(1, "2025-11-03 10:00:00")]).status_code == 503
+
+    monkeypatch.setenv('SYNC_TOKEN', 'another-secret')
+    assert push(central, 'GATE_A', [tap(1, "2025-11-03 10:00:00")]).status_code == 401
+    assert central.get('/api/sync/cursor?gate_id=GATE_A').status_code == 401
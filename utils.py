@@ -1,4 +1,5 @@
 import os
+import threading
 import pandas as pd
 from datetime import datetime
 
@@ -13,18 +14,27 @@ RECORD_DIR = os.path.join(BASE_DIR, 'Record')
 if not os.path.exists(RECORD_DIR):
     os.makedirs(RECORD_DIR)
 
+LOG_COLUMNS = [
+    'Type', 'Last_Name', 'First_Name', 
+    'ID_Number', 'Program', 'Date_Logged', 
+    'Time_In', 'Time_Out', 'Notes'
+]
+
+# Every update re-reads and rewrites a whole month file, so two concurrent
+# writers would silently drop each other's rows. Hold this around the cycle.
+LOG_WRITE_LOCK = threading.Lock()
+
 # ==========================================
 # HELPER FUNCTIONS
 # ==========================================
 
-def get_current_excel_path():
+def get_excel_path(month_key):
     """
-    Determines the path for the current month's Excel file.
+    Determines the path for a month's Excel file (month_key is 'YYYYMM').
     Creates the folder and file with headers if they don't exist.
     """
-    now = datetime.now()
-    year_folder = os.path.join(RECORD_DIR, str(now.year))
-    filename = f"log_{now.strftime('%Y%m')}.xlsx"
+    year_folder = os.path.join(RECORD_DIR, month_key[:4])
+    filename = f"log_{month_key}.xlsx"
     full_path = os.path.join(year_folder, filename)
 
     # Create Year Folder if missing
@@ -34,15 +44,17 @@ def get_current_excel_path():
     # Create File with Headers if missing
     if not os.path.exists(full_path):
         # Added 'Time_Out' and 'Notes'
-        df = pd.DataFrame(columns=[
-            'Type', 'Last_Name', 'First_Name', 
-            'ID_Number', 'Program', 'Date_Logged', 
-            'Time_In', 'Time_Out', 'Notes'
-        ])
+        df = pd.DataFrame(columns=LOG_COLUMNS)
         df.to_excel(full_path, index=False)
     
     return full_path
 
+def get_current_excel_path():
+    """
+    Determines the path for the current month's Excel file.
+    """
+    return get_excel_path(datetime.now().strftime('%Y%m'))
+
 def load_excel_data(file_path):
     """
     Safely loads Excel data, ensuring ID_Number is treated as a string.
@@ -57,4 +69,61 @@ def load_excel_data(file_path):
         return df
     except Exception as e:
         print(f"Error reading file: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+def apply_tap(log_df, user, current_date, current_time):
+    """
+    Runs the IN/OUT and "Forgotten Logout" rules for one tap against a month log.
+    `user` is a Master List row (ID_Number, First_Name, Last_Name, Role, Department).
+    Returns (log_df, action, message).
+    """
+    id_number = str(user['ID_Number'])
+    new_row = {
+        'Type': user['Role'],
+        'Last_Name': user['Last_Name'],
+        'First_Name': user['First_Name'],
+        'ID_Number': id_number,
+        'Program': user['Department'],
+        'Date_Logged': current_date,
+        'Time_In': current_time,
+        'Time_Out': None # Open session
+    }
+
+    # We filter the log to find this specific user's history
+    user_logs = log_df[log_df['ID_Number'] == id_number] if not log_df.empty else log_df
+
+    if not user_logs.empty:
+        # Get the very last entry for this user
+        last_index = user_logs.index[-1]
+        last_entry = log_df.loc[last_index]
+        
+        # Check if the last session is "Open" (Time_Out is empty/NaN)
+        is_open = pd.isna(last_entry['Time_Out']) or str(last_entry['Time_Out']).strip() == '' or str(last_entry['Time_Out']) == 'nan'
+
+        if is_open:
+            # An all-empty column reads back from Excel as float - make room for text
+            for col in ['Time_Out', 'Notes']:
+                if col not in log_df.columns:
+                    log_df[col] = None
+                log_df[col] = log_df[col].astype(object)
+
+            # We found an open session. Now check the DATE.
+            last_date = str(last_entry['Date_Logged'])
+            
+            if last_date == current_date:
+                # SCENARIO: SAME DAY -> TAP OUT
+                log_df.at[last_index, 'Time_Out'] = current_time
+                return log_df, "OUT", f"Goodbye, {user['First_Name']}!"
+
+            # SCENARIO: FORGOTTEN LOGOUT (Different Day)
+            # 1. Auto-close the old record (Set to 9:00 PM)
+            log_df.at[last_index, 'Time_Out'] = "21:00"
+            log_df.at[last_index, 'Notes'] = "Auto-Closed (Forgot Logout)"
+            
+            # 2. Create a NEW "IN" record for today
+            log_df = pd.concat([log_df, pd.DataFrame([new_row])], ignore_index=True)
+            return log_df, "IN", f"Welcome Back, {user['First_Name']}! (Previous session auto-closed)"
+
+    # Last session was closed, or first time ever logging in this month. Start a NEW one.
+    log_df = pd.concat([log_df, pd.DataFrame([new_row])], ignore_index=True)
+    return log_df, "IN", f"Welcome, {user['First_Name']}!"